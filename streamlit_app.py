@@ -1,49 +1,23 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-
-st.set_page_config(page_title="Impression Budget Calculator", layout="centered")
-
-# --- Load data from repo (no upload) ---
-DATA_PATH = "data/campaigns.csv"
-
-@st.cache_data
-def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
+import math
 
-    # Normalize headers (case/spacing)
-    df.columns = [c.strip().lower() for c in df.columns]
-
-    # Handle impression column variants (e.g., " impression " with spaces)
-    rename_map = {}
-    for c in list(df.columns):
-        if c.replace(" ", "") in {"impressions", "impression"}:
-            rename_map[c] = "impressions"
-    if rename_map:
-        df = df.rename(columns=rename_map)
-
-    # Ensure numeric types (handles numbers as strings)
-    if "cost" in df.columns:
-        df["cost"] = pd.to_numeric(df["cost"].astype(str).str.replace(",", ""), errors="coerce")
-    if "impressions" in df.columns:
-        df["impressions"] = pd.to_numeric(df["impressions"], errors="coerce")
-
-    # Required columns
-    req = ["campaign status", "platform", "campaign type", "cost", "impressions"]
-    missing = [c for c in req if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required columns in {path}: {missing}")
-
-    # Clean: keep rows with positive cost & impressions (keep ALL statuses)
-    df = df[(df["impressions"] > 0) & (df["cost"] > 0)].copy()
+import streamlit as st
 
-    # Effective CPM per row (for reference if needed)
-    df["cpm_calc"] = (df["cost"] / df["impressions"]) * 1000
+from budget_core import (
+    DATA_PATH,
+    THRESHOLD_IMPR,
+    build_cpm_table,
+    compute_result,
+    get_countries,
+    get_ctypes,
+    get_platforms,
+    load_data,
+)
 
-    return df
+st.set_page_config(page_title="Impression Budget Calculator", layout="centered")
 
 try:
     df = load_data(DATA_PATH)
+    cpm_overall, cpm_by_country = build_cpm_table(df)
 except Exception as e:
     st.error(f"Error loading data: {e}")
     st.stop()
@@ -51,10 +25,10 @@ except Exception as e:
 st.title("Ads. Impression Budget Calculator")
 
 # --- Inputs ---
-platforms = sorted(df["platform"].dropna().unique().tolist())
+platforms = get_platforms(df)
 platform = st.selectbox("Platform", platforms)
 
-ctype_opts = sorted(df[df["platform"] == platform]["campaign type"].dropna().unique().tolist())
+ctype_opts = get_ctypes(df, platform)
 ctype = st.selectbox("Campaign type", ctype_opts)
 
 target_impr = st.number_input(
@@ -64,74 +38,41 @@ target_impr = st.number_input(
     value=5_000_000
 )
 
-# --- Base slice for selected Platform × Campaign type ---
-base = df[(df["platform"] == platform) & (df["campaign type"] == ctype)].copy()
+flight_days = st.number_input("Flight length (days)", min_value=1, value=14, step=1)
 
-if base.empty:
+# --- Sanity check for the selected Platform × Campaign type ---
+if (platform, ctype) not in cpm_overall:
     st.warning("No data for the selected Platform × Campaign type.")
     st.stop()
 
 # --- Country selection (if column exists) ---
 country = "ALL/Overall"
-has_country = "country" in base.columns
+has_country = "country" in df.columns
 
 if has_country:
-    base["country"] = base["country"].astype(str)
-
-    country_vals = base["country"].dropna().unique().tolist()
-    all_labels = {"all", "all/overall", "overall"}
-
-    # All actual country labels except the ones that mean "all"
-    other_countries = [c for c in country_vals if c.strip().lower() not in all_labels]
-
-    options = ["Overall"] + sorted(other_countries)
+    # Cheap tuple unpack; the sorted labels are memoized per segment.
+    options = ("Overall", *get_countries(df, platform, ctype))
     country = st.selectbox("Country", options)
 else:
     st.caption("No country column found in this export; using all markets together.")
 
-# --- Overall CPM (ALL/Overall) ---
-overall_cost = base["cost"].sum()
-overall_impr = base["impressions"].sum()
-overall_cpm = (overall_cost / overall_impr) * 1000 if overall_impr > 0 else np.nan
-
-THRESHOLD_IMPR = 100_000  # minimum impressions to trust a country CPM
-used_country_cpm = False  # flag for the note
-country_impr = 0
-
-# --- Decide which CPM to use: country (if enough data) or overall ---
-if has_country and country != "ALL/Overall":
-    seg_country = base[base["country"] == country].copy()
-    country_impr = seg_country["impressions"].sum()
-    country_cost = seg_country["cost"].sum()
-
-    if country_impr >= THRESHOLD_IMPR:
-        # Enough data → use country CPM
-        cpm_eff = (country_cost / country_impr) * 1000
-        used_country_cpm = True
-    else:
-        # Not enough (or zero) → fall back to overall CPM
-        cpm_eff = overall_cpm
-        used_country_cpm = False
-else:
-    # ALL/Overall or no country column → use overall CPM
-    cpm_eff = overall_cpm
-    used_country_cpm = False
-
 # --- Estimated budget + time factor ---
-if np.isnan(cpm_eff):
+result = compute_result(
+    cpm_overall, cpm_by_country, platform, ctype, country, target_impr, flight_days
+)
+
+if math.isnan(result["cpm_eff"]):
     st.warning("Unable to compute CPM for this selection.")
 else:
-    estimated_budget = (target_impr / 1000.0) * cpm_eff
-    st.metric("Estimated budget (EUR)", f"€ {estimated_budget:,.2f}")
+    st.metric("Estimated budget (EUR)", f"€ {result['estimated_budget']:,.2f}")
 
     # Time factor / pacing
-    flight_days = st.number_input("Flight length (days)", min_value=1, value=14, step=1)
-    st.metric("Daily budget (EUR)", f"€ {(estimated_budget / flight_days):,.2f}")
-    st.metric("Daily impressions (est.)", f"{(target_impr / flight_days):,.0f}")
+    st.metric("Daily budget (EUR)", f"€ {result['daily_budget']:,.2f}")
+    st.metric("Daily impressions (est.)", f"{result['daily_impr']:,.0f}")
 
     # Country note
     if has_country and country != "ALL/Overall":
-        if used_country_cpm:
+        if result["used_country_cpm"]:
             st.caption(
                 f"Country used: {country} (≥ {THRESHOLD_IMPR:,} impressions for this Platform × Campaign type)."
             )